@@ -1,72 +1,88 @@
 import os
 import sys
+import numpy as np
 from PIL import Image
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill
 import argparse
 
+# Extensiones de imagen aceptadas (en minúsculas)
+VALID_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+# Representación hexadecimal precalculada de cada valor de canal (00..FF)
+_HEX = [format(i, '02X') for i in range(256)]
+
 def rgb_to_hex(rgb):
     """Convierte valores RGB a formato hexadecimal para Excel"""
-    return f"{rgb[0]:02X}{rgb[1]:02X}{rgb[2]:02X}"
+    return _HEX[rgb[0]] + _HEX[rgb[1]] + _HEX[rgb[2]]
+
+def pack_rgb(pixel_colors):
+    """Empaqueta los canales RGB de toda la imagen en un array HxW uint32 (0xRRGGBB)"""
+    return ((pixel_colors[..., 0].astype(np.uint32) << 16)
+            | (pixel_colors[..., 1].astype(np.uint32) << 8)
+            | pixel_colors[..., 2])
+
+def unpack_rgb(packed):
+    """Separa valores 0xRRGGBB empaquetados en tuplas (r, g, b)"""
+    return zip(((packed >> 16) & 0xFF).tolist(),
+               ((packed >> 8) & 0xFF).tolist(),
+               (packed & 0xFF).tolist())
 
 def load_image(image_path):
-    """Carga una imagen y la convierte a RGB si es necesario"""
+    """Carga una imagen como un array HxWx3 uint8 con los colores RGB de cada pixel"""
     try:
         image = Image.open(image_path)
-        # Convertir a RGB si la imagen tiene canal alpha o está en otro formato
-        if image.mode != 'RGB':
+        # Convertir a RGB si la imagen está en otro formato (paleta, grises...)
+        if image.mode not in ('RGB', 'RGBA'):
             image = image.convert('RGB')
-        return image
+        # Decodificar directamente a un array en una sola copia en C
+        pixel_colors = np.asarray(image)
+        # Descartar el canal alpha sin otra pasada de conversión de Pillow
+        if pixel_colors.shape[2] == 4:
+            pixel_colors = pixel_colors[..., :3]
+        return pixel_colors
     except Exception as e:
         print(f"Error al cargar la imagen: {e}")
         return None
 
-def get_pixel_colors(image):
-    """Extrae los colores de todos los pixels de la imagen"""
-    width, height = image.size
-    pixel_colors = []
-    
-    print(f"Procesando imagen de {width}x{height} pixels...")
-    
-    for y in range(height):
-        row_colors = []
-        for x in range(width):
-            # Obtener el color del pixel en la posición (x, y)
-            pixel_color = image.getpixel((x, y))
-            row_colors.append(pixel_color)
-        pixel_colors.append(row_colors)
-    
-    return pixel_colors, width, height
-
 def create_excel_with_colors(pixel_colors, width, height, output_path):
     """Crea un archivo Excel donde cada celda tiene el color del pixel correspondiente"""
     print("Creando archivo Excel...")
     
-    # Crear un nuevo workbook
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Imagen_Pixeles"
+    # Crear un nuevo workbook en modo write_only: las filas se escriben
+    # directamente al XML en vez de mantener todas las celdas en memoria
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Imagen_Pixeles")
     
     # Ajustar el tamaño de las celdas para que se vean más como pixels
-    # Hacer las celdas más pequeñas y cuadradas
-    for col in range(1, width + 1):
-        worksheet.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 2
-    
-    for row in range(1, height + 1):
-        worksheet.row_dimensions[row].height = 15
+    # Hacer las celdas más pequeñas y cuadradas con el tamaño por defecto de
+    # la hoja, en lugar de fijar cada columna y fila por separado
+    worksheet.sheet_format.defaultColWidth = 2
+    worksheet.sheet_format.defaultRowHeight = 15
+    worksheet.sheet_format.customHeight = True
+    
+    # Convertir todos los pixels a 0xRRGGBB de una vez y formatear en
+    # hexadecimal solo los colores distintos
+    packed = pack_rgb(pixel_colors)
+    uniq = np.unique(packed)
+    hex_map = dict(zip(uniq.tolist(), map(rgb_to_hex, unpack_rgb(uniq))))
     
     # Llenar cada celda con el color correspondiente
     for y in range(height):
+        row_cells = []
         for x in range(width):
-            rgb_color = pixel_colors[y][x]
-            hex_color = rgb_to_hex(rgb_color)
+            hex_color = hex_map[int(packed[y, x])]
             
             # Crear el fill con el color del pixel
             fill = PatternFill(start_color=hex_color, end_color=hex_color, fill_type="solid")
             
-            # Aplicar el color a la celda (Excel usa indexación 1-based)
-            cell = worksheet.cell(row=y + 1, column=x + 1)
+            cell = WriteOnlyCell(worksheet, value=None)
             cell.fill = fill
+            row_cells.append(cell)
+        
+        # Escribir la fila completa de una vez
+        worksheet.append(row_cells)
             
         # Mostrar progreso cada 10 filas
         if (y + 1) % 10 == 0:
@@ -74,7 +90,9 @@ def create_excel_with_colors(pixel_colors, width, height, output_path):
     
     # Guardar el archivo
     try:
-        workbook.save(output_path)
+        # Buffer de 1 MiB para escribir el zip con menos llamadas al sistema
+        with open(output_path, 'wb', buffering=1 << 20) as output_file:
+            workbook.save(output_file)
         print(f"Archivo Excel guardado como: {output_path}")
         return True
     except Exception as e:
@@ -89,20 +107,19 @@ def image_to_excel(image_path):
         return False
     
     # Verificar que es una imagen válida
-    valid_extensions = ['.png', '.jpg', '.jpeg', '.PNG', '.JPG', '.JPEG']
-    if not any(image_path.lower().endswith(ext) for ext in valid_extensions):
+    if os.path.splitext(image_path)[1].lower() not in VALID_EXTENSIONS:
         print("Error: El archivo debe ser PNG o JPG/JPEG.")
         return False
     
     print(f"Cargando imagen: {image_path}")
     
-    # 1. Cargar la imagen
-    image = load_image(image_path)
-    if image is None:
+    # 1. Cargar la imagen con la información de color de cada pixel
+    pixel_colors = load_image(image_path)
+    if pixel_colors is None:
         return False
     
-    # 2. Obtener información de color de cada pixel
-    pixel_colors, width, height = get_pixel_colors(image)
+    height, width = pixel_colors.shape[:2]
+    print(f"Procesando imagen de {width}x{height} pixels...")
     
     # Advertencia para imágenes muy grandes
     total_pixels = width * height
@@ -112,11 +129,11 @@ def image_to_excel(image_path):
             print("Operación cancelada.")
             return False
     
-    # 3. Crear nombre del archivo de salida
+    # 2. Crear nombre del archivo de salida
     base_name = os.path.splitext(image_path)[0]
     output_path = f"{base_name}.xlsx"
     
-    # 4. Crear el archivo Excel con los colores
+    # 3. Crear el archivo Excel con los colores
     success = create_excel_with_colors(pixel_colors, width, height, output_path)
     
     if success:
@@ -1,98 +1,294 @@
+import gc
+import importlib.util
 import os
 import sys
+import zipfile
+import numpy as np
 from PIL import Image
 import openpyxl
-from openpyxl.styles import PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.worksheet.merge import MergedCellRange
 import argparse
 
+# numba es opcional y solo se importa si se va a usar: importarlo ya cuesta
+# ~0.5 s y en la mayoría de las imágenes no llega a usarse
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+numba = None
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+# Extensiones de imagen aceptadas (en minúsculas)
+VALID_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+
+# Tamaño de cada celda/pixel en el Excel
+CELL_WIDTH = 1.5
+CELL_HEIGHT = 12
+
+# A partir de este tamaño se empaquetan los colores con numba (si está
+# instalado). Importar numba y cargar el kernel de la caché cuesta ~0.5 s
+# (~1.3 s la primera vez, al compilarlo) y ahorra ~6 ms por megapixel frente
+# a NumPy, además de los tres arrays temporales uint32 del cálculo con NumPy
+NUMBA_MIN_PIXELS = 100_000_000
+
+# En modo write_only se libera memoria cada GC_EVERY_ROWS filas para
+# mantener estable el uso de RAM
+GC_EVERY_ROWS = 1024
+
+# En modo normal, con pocos colores cada uno se registra como estilo con
+# nombre del workbook. openpyxl busca los estilos por nombre recorriendo la
+# lista, así que con más colores es más rápido asignar el fill directamente
+NAMED_STYLE_MAX_COLORS = 32
+
+# Buffer de escritura del archivo final (1 MiB) para reducir llamadas al sistema
+SAVE_BUFFER_SIZE = 1 << 20
+
+# Partes fijas del paquete xlsx para el modo rápido (--fast)
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+CONTENT_TYPES_XML = XML_HEADER + (
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = XML_HEADER + (
+    f'<Relationships xmlns="{PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = XML_HEADER + (
+    f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+    '<sheets><sheet name="Imagen_Pixeles" sheetId="1" r:id="rId1"/></sheets>'
+    '<calcPr calcMode="manual"/>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = XML_HEADER + (
+    f'<Relationships xmlns="{PKG_REL_NS}">'
+    f'<Relationship Id="rId1" Type="{REL_NS}/worksheet" Target="worksheets/sheet1.xml"/>'
+    f'<Relationship Id="rId2" Type="{REL_NS}/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Representación hexadecimal precalculada de cada valor de canal (00..FF)
+_HEX = [format(i, '02X') for i in range(256)]
+
 def rgb_to_hex(rgb):
     """Convierte valores RGB a formato hexadecimal para Excel"""
-    return f"{rgb[0]:02X}{rgb[1]:02X}{rgb[2]:02X}"
+    return _HEX[rgb[0]] + _HEX[rgb[1]] + _HEX[rgb[2]]
+
+_pack_rgb_kernel = None
+
+def _pack_rgb_loop(pixel_colors):
+    """Empaqueta RGB -> uint32 en una sola pasada, sin arrays temporales"""
+    height, width, _ = pixel_colors.shape
+    packed = np.empty((height, width), np.uint32)
+    for y in numba.prange(height):
+        for x in range(width):
+            packed[y, x] = ((np.uint32(pixel_colors[y, x, 0]) << 16)
+                            | (np.uint32(pixel_colors[y, x, 1]) << 8)
+                            | pixel_colors[y, x, 2])
+    return packed
+
+def get_pack_rgb_kernel():
+    """Importa numba y compila (o carga de la caché) el kernel la primera vez"""
+    global numba, _pack_rgb_kernel
+    if _pack_rgb_kernel is None:
+        import numba
+        _pack_rgb_kernel = numba.njit(parallel=True, cache=True)(_pack_rgb_loop)
+    return _pack_rgb_kernel
+
+def pack_rgb(pixel_colors):
+    """Empaqueta los canales RGB de toda la imagen en un array HxW uint32 (0xRRGGBB)"""
+    # Por debajo de NUMBA_MIN_PIXELS no compensa el tiempo de carga de numba
+    if NUMBA_AVAILABLE and pixel_colors.shape[0] * pixel_colors.shape[1] >= NUMBA_MIN_PIXELS:
+        return get_pack_rgb_kernel()(pixel_colors)
+    return ((pixel_colors[..., 0].astype(np.uint32) << 16)
+            | (pixel_colors[..., 1].astype(np.uint32) << 8)
+            | pixel_colors[..., 2])
+
+def unpack_rgb(packed):
+    """Separa valores 0xRRGGBB empaquetados en tuplas (r, g, b)"""
+    return zip(((packed >> 16) & 0xFF).tolist(),
+               ((packed >> 8) & 0xFF).tolist(),
+               (packed & 0xFF).tolist())
 
 def load_image(image_path):
-    """Carga una imagen y la convierte a RGB si es necesario"""
+    """Carga una imagen como un array HxWx3 uint8 con los colores RGB de cada pixel"""
     try:
         image = Image.open(image_path)
-        # Convertir a RGB si la imagen tiene canal alpha o está en otro formato
-        if image.mode != 'RGB':
+        # Convertir a RGB si la imagen está en otro formato (paleta, grises...)
+        if image.mode not in ('RGB', 'RGBA'):
             image = image.convert('RGB')
-        return image
+        # Decodificar directamente a un array en una sola copia en C
+        pixel_colors = np.asarray(image)
+        # Descartar el canal alpha sin otra pasada de conversión de Pillow
+        if pixel_colors.shape[2] == 4:
+            pixel_colors = pixel_colors[..., :3]
+        return pixel_colors
     except Exception as e:
         print(f"Error al cargar la imagen: {e}")
         return None
 
-def get_pixel_colors(image):
-    """Extrae los colores de todos los pixels de la imagen"""
-    width, height = image.size
-    pixel_colors = []
-    
-    print(f"Procesando imagen de {width}x{height} pixels...")
+def index_colors(pixel_colors, palette=None):
+    """Devuelve la lista de colores únicos en hexadecimal y un array HxW con
+    el índice de cada pixel dentro de esa lista"""
+    if palette is not None:
+        # Imagen cuantizada: el índice de la paleta ya es el índice del color
+        colors = np.array(palette, dtype=np.uint8).reshape(-1, 3)
+        return [rgb_to_hex(rgb) for rgb in colors.tolist()], pixel_colors
     
-    for y in range(height):
-        row_colors = []
-        for x in range(width):
-            # Obtener el color del pixel en la posición (x, y)
-            pixel_color = image.getpixel((x, y))
-            row_colors.append(pixel_color)
-        pixel_colors.append(row_colors)
-    
-    return pixel_colors, width, height
+    # np.unique deduplica en C y devuelve para cada pixel el índice de su color
+    packed = pack_rgb(pixel_colors)
+    uniq, inv = np.unique(packed, return_inverse=True)
+    return [rgb_to_hex(rgb) for rgb in unpack_rgb(uniq)], inv.reshape(packed.shape)
 
-def create_excel_with_colors(pixel_colors, width, height, output_path):
-    """Crea un archivo Excel donde cada celda tiene el color del pixel correspondiente"""
+def create_excel_with_colors(pixel_colors, width, height, output_path, write_only=True, palette=None,
+                             merge=False):
+    """Crea un archivo Excel donde cada celda tiene el color del pixel correspondiente
+    
+    Si se pasa la paleta de una imagen cuantizada, pixel_colors contiene los
+    índices de la paleta (HxW) en lugar de los colores RGB. Con merge=True los
+    pixels consecutivos del mismo color de cada fila se escriben como una sola
+    celda combinada (requiere el modo normal).
+    """
     print("Creando archivo Excel...")
     
-    # Crear un nuevo workbook
-    workbook = openpyxl.Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Imagen_Pixeles"
+    # Las celdas combinadas no están disponibles en modo write_only
+    write_only = write_only and not merge
     
-    # OPTIMIZACIÓN 1: Cache de estilos para evitar crear fills duplicados
-    fill_cache = {}
+    if write_only:
+        # Crear un nuevo workbook en modo write_only: las filas se escriben
+        # directamente al XML en vez de mantener todas las celdas en memoria
+        workbook = openpyxl.Workbook(write_only=True)
+        worksheet = workbook.create_sheet("Imagen_Pixeles")
+    else:
+        workbook = openpyxl.Workbook()
+        worksheet = workbook.active
+        worksheet.title = "Imagen_Pixeles"
     
     # OPTIMIZACIÓN 2: Ajustar tamaño de celdas de forma más eficiente
-    # Hacer las celdas más pequeñas y cuadradas
-    for col in range(1, width + 1):
-        worksheet.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 1.5
+    # Hacer las celdas más pequeñas y cuadradas con el tamaño por defecto de
+    # la hoja, en lugar de fijar cada columna y fila por separado
+    worksheet.sheet_format.defaultColWidth = CELL_WIDTH
+    worksheet.sheet_format.defaultRowHeight = CELL_HEIGHT
+    worksheet.sheet_format.customHeight = True
     
-    for row in range(1, height + 1):
-        worksheet.row_dimensions[row].height = 12
+    # OPTIMIZACIÓN 1: Un solo fill por color único, indexado por posición
+    hex_colors, inv = index_colors(pixel_colors, palette)
+    fills = [
+        PatternFill(
+            start_color=hex_color, 
+            end_color=hex_color, 
+            fill_type="solid"
+        )
+        for hex_color in hex_colors
+    ]
     
     # OPTIMIZACIÓN 3: Procesar por lotes y reusar fills
     total_cells = width * height
-    processed = 0
+    
+    if merge:
+        # Tabla de letras de columna para las coordenadas de los rangos
+        col_letters = [openpyxl.utils.get_column_letter(col) for col in range(1, width + 1)]
+        merged_ranges = []
+    elif not write_only:
+        # Recorrer las celdas ya creadas fila a fila en vez de llamar a
+        # worksheet.cell() (búsqueda y validación) para cada pixel
+        rows = worksheet.iter_rows(min_row=1, max_row=height, min_col=1, max_col=width)
+    
+    if not write_only:
+        # Registrar cada color una sola vez como estilo del workbook; las
+        # celdas solo guardan la referencia al estilo
+        use_named_styles = len(hex_colors) <= NAMED_STYLE_MAX_COLORS
+        if use_named_styles:
+            style_names = [f"c{hex_color}" for hex_color in hex_colors]
+            for name, fill in dict(zip(style_names, fills)).items():
+                named_style = NamedStyle(name=name)
+                named_style.fill = fill
+                workbook.add_named_style(named_style)
     
     for y in range(height):
-        for x in range(width):
-            rgb_color = pixel_colors[y][x]
-            hex_color = rgb_to_hex(rgb_color)
-            
-            # Reusar fill si ya existe para este color
-            if hex_color not in fill_cache:
-                fill_cache[hex_color] = PatternFill(
-                    start_color=hex_color, 
-                    end_color=hex_color, 
-                    fill_type="solid"
-                )
+        # Reusar el fill del pixel anterior mientras el color no cambia, lo
+        # que evita indexar la lista en los tramos de color liso
+        previous = -1
+        if write_only:
+            row_cells = []
+            for style in inv[y].tolist():
+                if style != previous:
+                    current_fill = fills[style]
+                    previous = style
+                cell = WriteOnlyCell(worksheet, value=None)
+                cell.fill = current_fill
+                row_cells.append(cell)
             
-            # Aplicar el color a la celda (Excel usa indexación 1-based)
-            cell = worksheet.cell(row=y + 1, column=x + 1)
-            cell.fill = fill_cache[hex_color]
+            # Escribir la fila completa de una vez
+            worksheet.append(row_cells)
             
-            processed += 1
+            if (y + 1) % GC_EVERY_ROWS == 0:
+                gc.collect()
+        elif merge:
+            # Dividir la fila en tramos del mismo color: solo se crea la celda
+            # superior izquierda de cada tramo y se combina con el resto
+            row_styles = inv[y]
+            bounds = np.flatnonzero(np.diff(np.concatenate(([-1], row_styles, [-1]))))
+            for x0, x1 in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+                cell = worksheet.cell(row=y + 1, column=x0 + 1)
+                if use_named_styles:
+                    cell.style = style_names[row_styles[x0]]
+                else:
+                    cell.fill = fills[row_styles[x0]]
+                
+                if x1 - x0 > 1:
+                    coord = f"{col_letters[x0]}{y + 1}:{col_letters[x1 - 1]}{y + 1}"
+                    merged_ranges.append(MergedCellRange(worksheet, coord))
+        elif use_named_styles:
+            for style, cell in zip(inv[y].tolist(), next(rows)):
+                if style != previous:
+                    current_name = style_names[style]
+                    previous = style
+                cell.style = current_name
+        else:
+            for style, cell in zip(inv[y].tolist(), next(rows)):
+                if style != previous:
+                    current_fill = fills[style]
+                    previous = style
+                cell.fill = current_fill
             
         # Mostrar progreso cada 10 filas
         if (y + 1) % 10 == 0:
+            # Se calcula aquí en vez de contar cada celda dentro del bucle
+            processed = (y + 1) * width
             progress = (processed / total_cells) * 100
-            print(f"Procesadas {y + 1}/{height} filas ({progress:.1f}% - {len(fill_cache)} colores únicos)")
+            print(f"Procesadas {y + 1}/{height} filas ({progress:.1f}% - {len(fills)} colores únicos)")
     
-    print(f"Total de colores únicos encontrados: {len(fill_cache)}")
+    if merge:
+        # Los tramos nunca se solapan, así que todos los rangos se asignan de
+        # una vez en vez de usar worksheet.merge_cells(), que compara cada
+        # rango nuevo con todos los anteriores
+        worksheet.merged_cells = MultiCellRange(merged_ranges)
+    
+    print(f"Total de colores únicos encontrados: {len(fills)}")
     
     # OPTIMIZACIÓN 4: Guardar con configuraciones de rendimiento
     try:
         # Deshabilitar cálculos automáticos para mejorar rendimiento
         workbook.calculation.calcMode = 'manual'
-        workbook.save(output_path)
+        with open(output_path, 'wb', buffering=SAVE_BUFFER_SIZE) as output_file:
+            workbook.save(output_file)
         print(f"Archivo Excel guardado como: {output_path}")
         print(f"NOTA: El archivo puede tardar en abrir debido a {total_cells:,} celdas coloreadas")
         return True
@@ -100,16 +296,152 @@ def create_excel_with_colors(pixel_colors, width, height, output_path):
         print(f"Error al guardar el archivo Excel: {e}")
         return False
 
-def reduce_colors(image, max_colors=256):
-    """Reduce el número de colores en la imagen para mejor rendimiento"""
+def build_styles_xml(hex_colors):
+    """Genera xl/styles.xml con un fill y un estilo de celda por cada color.
+    
+    El estilo i + 1 usa el fill i + 2 (los fills 0 y 1 son los reservados
+    por Excel y el estilo 0 es el estilo por defecto).
+    """
+    fills = ''.join(
+        f'<fill><patternFill patternType="solid"><fgColor rgb="FF{hex_color}"/>'
+        f'<bgColor rgb="FF{hex_color}"/></patternFill></fill>'
+        for hex_color in hex_colors
+    )
+    xfs = ''.join(
+        f'<xf numFmtId="0" fontId="0" fillId="{i + 2}" borderId="0" xfId="0" applyFill="1"/>'
+        for i in range(len(hex_colors))
+    )
+    return XML_HEADER + (
+        f'<styleSheet xmlns="{MAIN_NS}">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        f'<fills count="{len(hex_colors) + 2}">'
+        '<fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill>'
+        f'{fills}</fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(hex_colors) + 1}">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        f'{xfs}</cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    )
+
+def create_excel_fast(pixel_colors, width, height, output_path, palette=None):
+    """Crea el archivo Excel escribiendo directamente el XML del xlsx, sin openpyxl
+    
+    Todas las celdas están vacías y solo se diferencian por el índice de
+    estilo, así que cada fila se genera como texto con una sola pasada.
+    """
+    print("Creando archivo Excel (modo rápido)...")
+    
+    hex_colors, inv = index_colors(pixel_colors, palette)
+    # Índice de estilo de cada celda (el estilo 0 es el de por defecto). En
+    # imágenes cuantizadas inv es uint8, así que se amplía antes de sumar
+    # para que el índice 255 no se convierta en 0
+    styles = inv.astype(np.uint32) + 1
+    
+    # Tabla de letras de columna calculada una sola vez (A, B, ..., AMJ)
+    col_letters = [openpyxl.utils.get_column_letter(col) for col in range(1, width + 1)]
+    
+    sheet_header = XML_HEADER + (
+        f'<worksheet xmlns="{MAIN_NS}">'
+        f'<sheetFormatPr defaultColWidth="{CELL_WIDTH}" defaultRowHeight="{CELL_HEIGHT}" customHeight="1"/>'
+        '<sheetData>'
+    )
+    
+    try:
+        with open(output_path, 'wb', buffering=SAVE_BUFFER_SIZE) as output_file, \
+                zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as xlsx:
+            xlsx.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+            xlsx.writestr('_rels/.rels', ROOT_RELS_XML)
+            xlsx.writestr('xl/workbook.xml', WORKBOOK_XML)
+            xlsx.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+            xlsx.writestr('xl/styles.xml', build_styles_xml(hex_colors))
+            
+            with xlsx.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+                sheet.write(sheet_header.encode())
+                for y in range(height):
+                    row = y + 1
+                    cells = ''.join(
+                        f'<c r="{col}{row}" s="{style}"/>'
+                        for col, style in zip(col_letters, styles[y].tolist())
+                    )
+                    sheet.write(
+                        f'<row r="{row}">{cells}</row>'.encode()
+                    )
+                    
+                    # Mostrar progreso cada 10 filas
+                    if (y + 1) % 10 == 0:
+                        print(f"Procesadas {y + 1}/{height} filas...")
+                sheet.write(b'</sheetData></worksheet>')
+        
+        print(f"Total de colores únicos encontrados: {len(hex_colors)}")
+        print(f"Archivo Excel guardado como: {output_path}")
+        return True
+    except Exception as e:
+        print(f"Error al guardar el archivo Excel: {e}")
+        return False
+
+def create_excel_xlsxwriter(pixel_colors, width, height, output_path, palette=None):
+    """Crea el archivo Excel con xlsxwriter en lugar de openpyxl
+    
+    Con constant_memory cada fila se escribe al disco al pasar a la siguiente,
+    igual que el modo write_only de openpyxl pero con un bucle más ligero.
+    """
+    print("Creando archivo Excel (xlsxwriter)...")
+    
+    hex_colors, inv = index_colors(pixel_colors, palette)
+    
+    try:
+        workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+        worksheet = workbook.add_worksheet("Imagen_Pixeles")
+        
+        # Tamaño de todas las columnas y filas en una sola llamada
+        worksheet.set_column(0, width - 1, CELL_WIDTH)
+        worksheet.set_default_row(CELL_HEIGHT)
+        
+        # Un formato por color único, creado una sola vez fuera del bucle
+        formats = [workbook.add_format({'bg_color': f"#{hex_color}", 'pattern': 1})
+                   for hex_color in hex_colors]
+        
+        for y in range(height):
+            # Reusar el formato anterior mientras el color no cambia
+            previous = -1
+            for x, style in enumerate(inv[y].tolist()):
+                if style != previous:
+                    current_format = formats[style]
+                    previous = style
+                worksheet.write_blank(y, x, None, current_format)
+            
+            # Mostrar progreso cada 10 filas
+            if (y + 1) % 10 == 0:
+                print(f"Procesadas {y + 1}/{height} filas...")
+        
+        print(f"Total de colores únicos encontrados: {len(hex_colors)}")
+        
+        # Deshabilitar cálculos automáticos para mejorar rendimiento
+        workbook.set_calc_mode('manual')
+        workbook.close()
+        print(f"Archivo Excel guardado como: {output_path}")
+        return True
+    except Exception as e:
+        print(f"Error al guardar el archivo Excel: {e}")
+        return False
+
+def reduce_colors(pixel_colors, max_colors=256, method=None):
+    """Reduce el número de colores en la imagen para mejor rendimiento
+    
+    Devuelve un array HxW con el índice de cada pixel en la paleta y la paleta.
+    """
     print(f"Reduciendo colores a máximo {max_colors} para mejor rendimiento...")
-    # Cuantizar la imagen para reducir colores
-    if image.mode != 'P':
-        image = image.quantize(colors=max_colors)
-        image = image.convert('RGB')
-    return image
+    # Cuantizar la imagen para reducir colores. Se mantiene en modo 'P' para
+    # usar directamente la paleta (≤ max_colors fills) sin volver a deduplicar
+    image = Image.fromarray(pixel_colors).quantize(colors=max_colors, method=method)
+    return np.asarray(image), image.getpalette()
 
-def image_to_excel(image_path):
+def image_to_excel(image_path, write_only=True, fast=False, max_colors=256, merge=False,
+                   use_xlsxwriter=False):
     """Función principal que convierte una imagen a Excel"""
     # Verificar que el archivo existe
     if not os.path.exists(image_path):
@@ -117,21 +449,32 @@ def image_to_excel(image_path):
         return False
     
     # Verificar que es una imagen válida
-    valid_extensions = ['.png', '.jpg', '.jpeg', '.PNG', '.JPG', '.JPEG']
-    if not any(image_path.lower().endswith(ext) for ext in valid_extensions):
+    if os.path.splitext(image_path)[1].lower() not in VALID_EXTENSIONS:
         print("Error: El archivo debe ser PNG o JPG/JPEG.")
         return False
     
+    if use_xlsxwriter and xlsxwriter is None:
+        print("Error: Para usar --xlsxwriter hay que instalar el paquete xlsxwriter (pip install xlsxwriter).")
+        return False
+    
     print(f"Cargando imagen: {image_path}")
     
-    # 1. Cargar la imagen
-    image = load_image(image_path)
-    if image is None:
+    # 1. Cargar la imagen con la información de color de cada pixel
+    pixel_colors = load_image(image_path)
+    if pixel_colors is None:
         return False
     
-    # Advertencia para imágenes muy grandes
-    total_pixels = image.width * image.height
-    if total_pixels > 10000:  # Más de 100x100
+    height, width = pixel_colors.shape[:2]
+    palette = None
+    
+    # En modo rápido se cuantiza siempre para que styles.xml tenga como
+    # máximo max_colors estilos y el archivo abra rápido en Excel
+    if fast:
+        pixel_colors, palette = reduce_colors(pixel_colors, max_colors, Image.Quantize.FASTOCTREE)
+    
+    # Advertencia para imágenes muy grandes (si no se redujeron ya los colores)
+    total_pixels = width * height
+    if total_pixels > 10000 and palette is None:  # Más de 100x100
         print(f"La imagen tiene {total_pixels:,} pixels.")
         print("Para mejor rendimiento, se recomienda:")
         print("1. Reducir colores (más rápido)")
@@ -140,21 +483,26 @@ def image_to_excel(image_path):
         
         choice = input("Elige una opción (1/2/3): ").strip()
         if choice == '1':
-            image = reduce_colors(image)
+            pixel_colors, palette = reduce_colors(pixel_colors, max_colors)
         elif choice == '3':
             print("Operación cancelada.")
             return False
         # Si elige 2, continúa sin cambios
     
-    # 2. Obtener información de color de cada pixel
-    pixel_colors, width, height = get_pixel_colors(image)
+    print(f"Procesando imagen de {width}x{height} pixels...")
     
-    # 3. Crear nombre del archivo de salida
+    # 2. Crear nombre del archivo de salida
     base_name = os.path.splitext(image_path)[0]
     output_path = f"{base_name}.xlsx"
     
-    # 4. Crear el archivo Excel con los colores
-    success = create_excel_with_colors(pixel_colors, width, height, output_path)
+    # 3. Crear el archivo Excel con los colores
+    if fast:
+        success = create_excel_fast(pixel_colors, width, height, output_path, palette)
+    elif use_xlsxwriter:
+        success = create_excel_xlsxwriter(pixel_colors, width, height, output_path, palette)
+    else:
+        success = create_excel_with_colors(pixel_colors, width, height, output_path, write_only, palette,
+                                           merge)
     
     if success:
         print(f"\n¡Conversión completada!")
@@ -172,6 +520,17 @@ def main():
     """Función principal con interfaz de línea de comandos"""
     parser = argparse.ArgumentParser(description='Convierte una imagen PNG/JPG a Excel con colores de pixels')
     parser.add_argument('image_path', help='Ruta a la imagen PNG o JPG')
+    parser.add_argument('--no-write-only', action='store_true',
+                        help='Crea el Excel en modo normal en lugar de write_only (más lento y usa más memoria)')
+    parser.add_argument('--fast', action='store_true',
+                        help='Escribe el XML del Excel directamente sin openpyxl (mucho más rápido)')
+    parser.add_argument('--max-colors', type=int, default=256,
+                        help='Número máximo de colores al reducir colores, entre 1 y 256 (por defecto 256)')
+    parser.add_argument('--merge', action='store_true',
+                        help='Combina los pixels consecutivos del mismo color de cada fila en una sola celda '
+                             '(usa el modo normal, no compatible con --fast)')
+    parser.add_argument('--xlsxwriter', action='store_true',
+                        help='Escribe el Excel con xlsxwriter en lugar de openpyxl (requiere el paquete xlsxwriter)')
     
     # Si no se proporcionan argumentos, pedir la ruta interactivamente
     if len(sys.argv) == 1:
@@ -183,12 +542,20 @@ def main():
         if not image_path:
             print("No se proporcionó ninguna ruta.")
             return
+        args = parser.parse_args([image_path])
     else:
         args = parser.parse_args()
-        image_path = args.image_path
+    
+    if not 1 <= args.max_colors <= 256:
+        parser.error("--max-colors debe estar entre 1 y 256")
+    if args.merge and args.fast:
+        parser.error("--merge no es compatible con --fast")
+    if args.xlsxwriter and (args.fast or args.merge):
+        parser.error("--xlsxwriter no es compatible con --fast ni con --merge")
     
     # Procesar la imagen
-    image_to_excel(image_path)
+    image_to_excel(args.image_path, write_only=not args.no_write_only, fast=args.fast,
+                   max_colors=args.max_colors, merge=args.merge, use_xlsxwriter=args.xlsxwriter)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file